@@ -6,10 +6,15 @@ and extract semantic relationships (triples: subject-predicate-object, quads: wi
 """
 
 import os
+import re
 import sys
 import json
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import get_context
 from pathlib import Path
 
+from kg_analysis import map_files
+
 # Add serena to path
 serena_path = Path("/workspace/serena/src")
 sys.path.insert(0, str(serena_path))
@@ -20,7 +25,6 @@ try:
     from serena.config.serena_config import SerenaConfig
     from serena.tools import (
         OnboardingTool,
-        FindSymbolTool,
         GetSymbolsOverviewTool,
         FindReferencingSymbolsTool,
         ReadFileTool,
@@ -32,89 +36,175 @@ except ImportError as e:
     print("Trying to use Serena via MCP server instead...")
     sys.exit(1)
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def write_jsonl(stream, records):
+    """
+    Write records to a binary stream as JSON lines and return how many were written.
+    """
+    count = 0
+    for record in records:
+        if orjson is not None:
+            stream.write(orjson.dumps(record))
+        else:
+            stream.write(json.dumps(record).encode('utf-8'))
+        stream.write(b'\n')
+        count += 1
+    return count
+
+
+def unique_records(records, seen):
+    """
+    Yield only records whose (subject, predicate, object, graph) key is not yet in seen.
+    """
+    for record in records:
+        key = (record['subject'], record['predicate'], record['object'], record['graph'])
+        if key in seen:
+            continue
+        seen.add(key)
+        yield record
+
+
+# Coarse definition/import scan; one pass replaces a FindSymbolTool lookup per keyword.
+# Statements start a line or follow a ';'. Groups: def/class keyword and name,
+# the module of a 'from X import ...', or the whole clause of a plain 'import ...'
+SYMBOL_RE = re.compile(
+    r'(?:^|;)[ \t]*(?:(def|class)\s+([\w.]+)|from[ \t]+([\w.]+)[ \t]+import\b|import[ \t]+([^;#\n]+))',
+    re.MULTILINE
+)
+
+SYMBOL_KINDS = {'def': 'function', 'class': 'class'}
+
 
 def extract_triples_from_symbol(symbol_info, file_path, context=""):
     """
-    Extract triples (subject-predicate-object) from symbol information.
+    Yield triples (subject-predicate-object) from symbol information.
     """
-    triples = []
-    
     symbol_name = symbol_info.get('name', '')
     symbol_kind = symbol_info.get('kind', '')
     symbol_location = symbol_info.get('location', {})
     
     # Triple: symbol - is_a - kind
     if symbol_name and symbol_kind:
-        triples.append({
+        yield {
             'subject': symbol_name,
             'predicate': 'is_a',
             'object': symbol_kind,
             'context': file_path,
             'graph': context
-        })
+        }
     
     # Triple: symbol - defined_in - file
     if symbol_name and file_path:
-        triples.append({
+        yield {
             'subject': symbol_name,
             'predicate': 'defined_in',
             'object': file_path,
             'context': context,
             'graph': 'code_structure'
-        })
+        }
     
     # Triple: symbol - located_at - location
     if symbol_name and symbol_location:
         line = symbol_location.get('line', 0)
         if line:
-            triples.append({
+            yield {
                 'subject': symbol_name,
                 'predicate': 'located_at',
                 'object': f"{file_path}:{line}",
                 'context': context,
                 'graph': 'code_structure'
-            })
-    
-    return triples
+            }
+
+
+def extract_triples_from_content(content, file_path):
+    """
+    Yield triples for the definitions and imports found in a single regex pass over file content.
+    """
+    file_name = os.path.basename(file_path)
+    line = 1
+    last = 0
+    for match in SYMBOL_RE.finditer(content):
+        line += content.count('\n', last, match.start())
+        last = match.start()
+        keyword, name, from_module, import_clause = match.groups()
+        
+        if keyword is None:
+            # 'import a, b as c' names several modules; aliases are dropped
+            if from_module:
+                modules = [from_module]
+            else:
+                modules = [alias.split()[0] for alias in import_clause.split(',') if alias.strip()]
+            for module in modules:
+                # Triple: file - imports - module
+                yield {
+                    'subject': file_name,
+                    'predicate': 'imports',
+                    'object': module,
+                    'context': file_path,
+                    'graph': 'dependencies'
+                }
+        else:
+            symbol_info = {'name': name, 'kind': SYMBOL_KINDS[keyword], 'location': {'line': line}}
+            yield from extract_triples_from_symbol(symbol_info, file_path, context='code_structure')
+
+
+def analyze_one(file_path):
+    """
+    Read one file and return its definition/import triples, or None if it cannot be read.
+    """
+    try:
+        content = Path(file_path).read_text(encoding='utf-8', errors='ignore')
+    except OSError as e:
+        print(f"Error reading {os.path.basename(file_path)}: {e}")
+        return None
+    return list(extract_triples_from_content(content, file_path))
 
 
 def extract_quads_from_references(references, source_symbol, file_path, context=""):
     """
-    Extract quads (subject-predicate-object-graph) from reference relationships.
+    Yield quads (subject-predicate-object-graph) from reference relationships.
+    Only the forward 'references' quad is emitted; see inverse_quad for the reverse.
     """
-    quads = []
-    
     for ref in references:
         ref_symbol = ref.get('name', '')
         ref_file = ref.get('location', {}).get('file', '')
-        ref_kind = ref.get('kind', '')
         
         if ref_symbol and source_symbol:
             # Quad: source_symbol - references - ref_symbol - in_context
-            quads.append({
+            yield {
                 'subject': source_symbol,
                 'predicate': 'references',
                 'object': ref_symbol,
                 'graph': f"{file_path}->{ref_file}",
                 'context': context
-            })
-            
-            # Quad: ref_symbol - referenced_by - source_symbol - in_context
-            quads.append({
-                'subject': ref_symbol,
-                'predicate': 'referenced_by',
-                'object': source_symbol,
-                'graph': f"{ref_file}->{file_path}",
-                'context': context
-            })
-    
-    return quads
+            }
+
+
+def inverse_quad(quad):
+    """
+    Derive the referenced_by quad from a references quad.
+    Only the forward direction is stored; use this where the reverse index is needed.
+    """
+    source_file, _, ref_file = quad['graph'].partition('->')
+    return {
+        'subject': quad['object'],
+        'predicate': 'referenced_by',
+        'object': quad['subject'],
+        'graph': f"{ref_file}->{source_file}",
+        'context': quad['context']
+    }
 
 
 def analyze_repository_with_serena(project_path):
     """
     Use Serena to analyze the repository and extract semantic relationships.
     """
+    project_path = Path(project_path)
     print(f"Initializing Serena agent for project: {project_path}")
     
     # Initialize Serena agent
@@ -131,75 +221,104 @@ def analyze_repository_with_serena(project_path):
     
     print("Serena agent initialized successfully")
     
-    # Perform onboarding
-    print("\n=== Performing Onboarding ===")
+    # Onboarding is the slowest single call and nothing needs its result until
+    # the output is saved, so run it in the background while files are analyzed
+    print("\n=== Starting Onboarding ===")
     onboarding_tool = agent.get_tool(OnboardingTool)
-    onboarding_result = onboarding_tool.apply()
-    print(f"Onboarding instructions: {onboarding_result[:500]}...")
-    
-    # Get all Python files
-    print("\n=== Discovering Python Files ===")
-    list_dir_tool = agent.get_tool(ListDirTool)
-    files_result = list_dir_tool.apply(project_path, recursive=True)
-    print(f"Found files: {files_result[:200]}...")
-    
-    # Extract triples and quads
-    all_triples = []
-    all_quads = []
-    
-    # Analyze main files
-    python_files = [
-        "kawai.py",
-        "install.py",
-    ]
-    
-    for filename in python_files:
-        file_path = os.path.join(project_path, filename)
-        if not os.path.exists(file_path):
-            continue
-            
-        print(f"\n=== Analyzing {filename} ===")
+    # The with block shuts the executor down even if the per-file loop raises
+    with ThreadPoolExecutor(max_workers=1) as onboarding_executor:
+        onboarding_future = onboarding_executor.submit(onboarding_tool.apply)
         
-        # Get symbols overview
-        try:
-            symbols_tool = agent.get_tool(GetSymbolsOverviewTool)
-            symbols_result = symbols_tool.apply(file_path)
-            print(f"Symbols in {filename}: {symbols_result[:300]}...")
-            
-            # Parse symbols (this is a simplified version - actual parsing would be more complex)
-            # For now, we'll extract what we can from the text output
-            
-        except Exception as e:
-            print(f"Error analyzing {filename}: {e}")
+        # Get all Python files
+        print("\n=== Discovering Python Files ===")
+        list_dir_tool = agent.get_tool(ListDirTool)
+        files_result = list_dir_tool.apply(project_path, recursive=True)
+        print(f"Found files: {files_result[:200]}...")
+        
+        # Resolve per-file tools once rather than on every loop iteration
+        symbols_tool = agent.get_tool(GetSymbolsOverviewTool)
         
-        # Find symbols
-        try:
-            find_symbol_tool = agent.get_tool(FindSymbolTool)
-            # Search for common patterns
-            for pattern in ["def ", "class ", "import "]:
+        # Triples are streamed to a JSON Lines file as they are produced instead of
+        # being held in memory until the end of the run. No quads are written: nothing
+        # here collects references yet (see extract_quads_from_references)
+        triples_file = project_path / "serena_triples.jsonl"
+        triple_count = 0
+        # Keys already written, so repeated symbols are only emitted once
+        seen_triples = set()
+        
+        # Analyze main files
+        python_files = [
+            "kawai.py",
+            "install.py",
+        ]
+        # One directory scan instead of a stat per candidate file
+        present = {entry.name for entry in os.scandir(project_path) if entry.is_file()}
+        target_files = [filename for filename in python_files if filename in present]
+        
+        # Serena tools share one agent and language server and are not known to be
+        # thread-safe, so each tool class gets a single worker of its own: symbol
+        # overviews run one at a time, overlapping only with onboarding. The local
+        # parse of each file is CPU-bound and leaves the process for larger batches
+        with ThreadPoolExecutor(max_workers=1) as executor, \
+                open(triples_file, 'wb', buffering=1 << 20) as triples_out:
+            # Queue every symbol overview up front so they run while files are scanned
+            symbol_overviews = {
+                filename: executor.submit(symbols_tool.apply, str(project_path / filename))
+                for filename in target_files
+            }
+            # Larger batches are scanned in worker processes. By then the onboarding and
+            # symbol-overview threads are running, and forking a threaded process can
+            # deadlock the child, so the workers are spawned instead
+            file_triples = map_files(
+                analyze_one,
+                [str(project_path / filename) for filename in target_files],
+                mp_context=get_context('spawn')
+            )
+            
+            for filename, triples in zip(target_files, file_triples):
+                print(f"\n=== Analyzing {filename} ===")
+                
+                # Get symbols overview
                 try:
-                    symbols = find_symbol_tool.apply(pattern, file_path=file_path)
-                    print(f"Found symbols matching '{pattern}': {symbols[:200]}...")
+                    symbols_result = symbol_overviews[filename].result()
+                    print(f"Symbols in {filename}: {symbols_result[:300]}...")
+                    
+                    # Parse symbols (this is a simplified version - actual parsing would be more complex)
+                    # For now, we'll extract what we can from the text output
+                    
                 except Exception as e:
-                    print(f"Error searching for '{pattern}': {e}")
-        except Exception as e:
-            print(f"Error in symbol search: {e}")
+                    print(f"Error analyzing {filename}: {e}")
+                
+                # Definitions and imports are found locally instead of one FindSymbolTool call per keyword
+                if triples is None:
+                    continue
+                
+                written = write_jsonl(triples_out, unique_records(triples, seen_triples))
+                triple_count += written
+                print(f"Found {written} definition/import triples in {filename}")
+        
+        print("\n=== Performing Onboarding ===")
+        onboarding_result = onboarding_future.result()
+    
+    print(f"Onboarding instructions: {onboarding_result[:500]}...")
     
     # Save results
     results = {
-        'triples': all_triples,
-        'quads': all_quads,
+        'triples_file': str(triples_file),
+        'triple_count': triple_count,
         'onboarding': onboarding_result,
     }
     
-    output_file = os.path.join(project_path, "serena_analysis.json")
-    with open(output_file, 'w') as f:
-        json.dump(results, f, indent=2)
+    output_file = project_path / "serena_analysis.json"
+    if orjson is not None:
+        output_file.write_bytes(orjson.dumps(results, option=orjson.OPT_INDENT_2))
+    else:
+        output_file.write_text(json.dumps(results, indent=2))
     
     print(f"\n=== Analysis Complete ===")
     print(f"Results saved to: {output_file}")
-    print(f"Total triples extracted: {len(all_triples)}")
-    print(f"Total quads extracted: {len(all_quads)}")
+    print(f"Triples streamed to: {triples_file}")
+    print(f"Total triples extracted: {triple_count}")
     
     return results
 
@@ -5,7 +5,9 @@ Extract knowledge in the form of triples and quads.
 """
 import json
 import sys
-import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
 
 # Add serena to path
 sys.path.insert(0, '/workspace/serena/src')
@@ -15,13 +17,18 @@ from serena.tools.file_tools import ListDirTool, ReadFileTool, SearchForPatternT
 from serena.tools.symbol_tools import GetSymbolsOverviewTool, FindSymbolTool
 from serena.tools.memory_tools import WriteMemoryTool, ListMemoriesTool
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-def extract_triples_from_code(agent, filepath: str) -> list[dict]:
+
+def extract_triples_from_code(tools: dict, filepath: str) -> list[dict]:
     """Extract semantic triples from code analysis."""
     triples = []
     
     # Get symbols overview
-    overview_tool = agent.get_tool(GetSymbolsOverviewTool)
+    overview_tool = tools[GetSymbolsOverviewTool]
     try:
         result = overview_tool.apply(filepath)
         if result and "error" not in result.lower():
@@ -41,7 +48,7 @@ def extract_triples_from_code(agent, filepath: str) -> list[dict]:
     return triples
 
 
-def analyze_project_structure(agent, project_path: str) -> dict:
+def analyze_project_structure(tools: dict, project_path: str) -> dict:
     """Analyze the project structure and extract metadata."""
     analysis = {
         "project_path": project_path,
@@ -51,7 +58,7 @@ def analyze_project_structure(agent, project_path: str) -> dict:
     }
     
     # List directory contents
-    list_dir_tool = agent.get_tool(ListDirTool)
+    list_dir_tool = tools[ListDirTool]
     try:
         dir_content = list_dir_tool.apply(project_path, recursive=True)
         analysis["directory_structure"] = dir_content
@@ -68,9 +75,9 @@ def analyze_project_structure(agent, project_path: str) -> dict:
     return analysis
 
 
-def read_and_analyze_files(agent, project_path: str, analysis: dict) -> dict:
+def read_and_analyze_files(tools: dict, project_path: str, analysis: dict) -> dict:
     """Read and analyze key files."""
-    read_file_tool = agent.get_tool(ReadFileTool)
+    read_file_tool = tools[ReadFileTool]
     
     key_files = ["README.md", "install.py", "requirements.txt"]
     
@@ -104,15 +111,20 @@ def read_and_analyze_files(agent, project_path: str, analysis: dict) -> dict:
     return analysis
 
 
-def search_for_patterns(agent, analysis: dict) -> dict:
+def search_for_patterns(tools: dict, analysis: dict) -> dict:
     """Search for important patterns in the codebase."""
-    search_tool = agent.get_tool(SearchForPatternTool)
+    search_tool = tools[SearchForPatternTool]
     
     patterns = ["import", "def ", "class ", "API", "GPT", "openai"]
     
-    for pattern in patterns:
+    # Searches are I/O-bound, so run them concurrently and only keep the
+    # triple bookkeeping below serial
+    with ThreadPoolExecutor(max_workers=min(8, len(patterns))) as executor:
+        futures = [executor.submit(search_tool.apply, pattern) for pattern in patterns]
+    
+    for pattern, future in zip(patterns, futures):
         try:
-            result = search_tool.apply(pattern)
+            result = future.result()
             if result and "no matches" not in result.lower():
                 analysis["triples"].append({
                     "subject": "kawaiigpt",
@@ -125,15 +137,16 @@ def search_for_patterns(agent, analysis: dict) -> dict:
     return analysis
 
 
-def save_memories(agent, analysis: dict):
+def save_memories(tools: dict, analysis: dict):
     """Save analysis results to Serena memories."""
-    write_memory_tool = agent.get_tool(WriteMemoryTool)
+    write_memory_tool = tools[WriteMemoryTool]
     
     # Save project overview
+    timestamp = datetime.now().isoformat(timespec='seconds')
     overview_content = f"""# kawaiigpt Project Overview
 
 ## Project Analysis Date
-{os.popen('date').read().strip()}
+{timestamp}
 
 ## Directory Structure
 {analysis.get('directory_structure', 'Not available')[:2000]}
@@ -191,25 +204,37 @@ def main():
         print(f"   Error initializing agent: {e}")
         return
     
+    # Resolve each tool once up front instead of on every helper call
+    tools = {
+        tool_class: agent.get_tool(tool_class)
+        for tool_class in (
+            ListDirTool,
+            ReadFileTool,
+            SearchForPatternTool,
+            GetSymbolsOverviewTool,
+            WriteMemoryTool,
+        )
+    }
+    
     # Analyze project structure
     print("\n2. Analyzing project structure...")
-    analysis = analyze_project_structure(agent, project_path)
+    analysis = analyze_project_structure(tools, project_path)
     print(f"   Found directory structure")
     
     # Read and analyze files
     print("\n3. Reading and analyzing key files...")
-    analysis = read_and_analyze_files(agent, project_path, analysis)
+    analysis = read_and_analyze_files(tools, project_path, analysis)
     print(f"   Analyzed {len(analysis['files'])} files")
     
     # Search for patterns
     print("\n4. Searching for patterns...")
-    analysis = search_for_patterns(agent, analysis)
+    analysis = search_for_patterns(tools, analysis)
     print(f"   Extracted {len(analysis['triples'])} triples")
     print(f"   Extracted {len(analysis['quads'])} quads")
     
     # Save memories
     print("\n5. Saving memories...")
-    save_memories(agent, analysis)
+    save_memories(tools, analysis)
     
     # Print summary
     print("\n" + "=" * 60)
@@ -222,9 +247,11 @@ def main():
         print(f"  - {triple['subject']} --[{triple['predicate']}]--> {triple['object'][:50]}...")
     
     # Save full analysis to file
-    output_file = "/workspace/kawaiigpt/.serena/analysis_output.json"
-    with open(output_file, 'w') as f:
-        json.dump(analysis, f, indent=2, default=str)
+    output_file = Path(project_path) / ".serena" / "analysis_output.json"
+    if orjson is not None:
+        output_file.write_bytes(orjson.dumps(analysis, default=str, option=orjson.OPT_INDENT_2))
+    else:
+        output_file.write_text(json.dumps(analysis, indent=2, default=str))
     print(f"\nFull analysis saved to: {output_file}")
     
     return analysis
@@ -5,8 +5,158 @@ for obfuscated code, then writes comprehensive results to Serena.
 """
 
 import json
+import re
 from pathlib import Path
-from collections import defaultdict
+from collections import Counter, defaultdict
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Import keyword table, compiled once instead of re-scanning keyword lists per import.
+# Rules are checked in order and the first match decides the category.
+IMPORT_FEATURE_RULES = [
+    (re.compile(r'crypto|hashlib|base64|zlib'), 'cryptography',
+     'Code obfuscation/encryption capabilities'),
+    (re.compile(r'os|sys|warnings'), 'system_integration',
+     'System-level operations'),
+    (re.compile(r'types|builtins'), 'type_system',
+     'Dynamic type manipulation (common in obfuscated code)'),
+]
+
+# All dependency keywords folded into one pattern. Every branch is a lookahead
+# anchored at the start of the name, so branches are tried in order and the
+# first one that hits wins, same as an if/elif chain. Matching already runs inside
+# the C regex engine; Numba cannot compile str/dict code in nopython mode, and a
+# Cython or hyperscan build is not worth it for a requirements-sized input.
+DEPENDENCY_FEATURE_RE = re.compile(
+    r'^(?:'
+    r'(?=.*(?:tts|audio|sound))(?P<voice>)'
+    r'|(?=.*translate)(?P<translate>)'
+    r'|(?=.*crypto)(?P<crypto>)'
+    r'|(?=.*request)(?P<request>)'
+    r'|(?=.*(?:toolkit|prompt))(?P<toolkit>)'
+    r'|(?=.*useragent)(?P<useragent>)'
+    r'|(?=.*colorama)(?P<colorama>)'
+    r'|(?=.*regex)(?P<regex>)'
+    r'|(?=.*pexpect)(?P<pexpect>)'
+    r'|(?=.*pydub)(?P<pydub>)'
+    r')'
+)
+
+DEPENDENCY_FEATURES = {
+    'voice': ('voice_processing', 'Text-to-speech and audio playback'),
+    'translate': ('translation', 'Multi-language translation'),
+    'crypto': ('cryptography', 'Encryption and cryptographic operations'),
+    'request': ('api_integration', 'HTTP requests and API communication'),
+    'toolkit': ('user_interface', 'Interactive command-line interface'),
+    'useragent': ('api_integration', 'HTTP client spoofing/user agent rotation'),
+    'colorama': ('user_interface', 'Colored terminal output'),
+    'regex': ('data_processing', 'Pattern matching and text processing'),
+    'pexpect': ('system_integration', 'Process automation and interaction'),
+    'pydub': ('data_processing', 'Audio file manipulation'),
+}
+
+DEFAULT_DEPENDENCY_FEATURE = ('utilities', 'General utility functionality')
+
+# Markdown row templates for the Serena memory file
+CATEGORY_HEAD = "### {name} ({count} items)\n\n"
+SECTION_HEAD = "### {name}\n\n"
+FEATURE_HEAD = "#### {name}\n"
+FEATURE_ROWS = "- **Description**: {description}\n- **Category**: {category}\n"
+DEP_ROW = "- **{dependency}**: {capability}\n"
+INFERRED_ROW = "- **{module}**: {inference}\n"
+
+# Static feature taxonomy; contains no run-time values, so it is built once at import
+COMPREHENSIVE_CATEGORIZATION = {
+    'core_features': {
+        'installation_management': {
+            'description': 'Automated dependency installation and environment setup',
+            'components': ['install.py:up_package', 'install.py:pip_install', 'install.py:install_modules'],
+            'category': 'installation'
+        },
+        'platform_detection': {
+            'description': 'Cross-platform compatibility detection (Termux/Linux/Android)',
+            'components': ['install.py:detect_os', 'install.py:check'],
+            'category': 'platform_detection'
+        },
+        'code_obfuscation': {
+            'description': 'Code protection and obfuscation (kawai.py is obfuscated)',
+            'components': ['kawai.py:obfuscated_code', 'Crypto.Cipher.AES', 'base64', 'zlib', 'hashlib'],
+            'category': 'cryptography',
+            'note': 'Main application code is obfuscated for protection'
+        }
+    },
+    'application_features': {
+        'ai_chatbot': {
+            'description': 'AI-powered conversational interface',
+            'components': ['kawai.py (obfuscated)', 'prompt_toolkit'],
+            'category': 'user_interface',
+            'inferred': True
+        },
+        'voice_interaction': {
+            'description': 'Text-to-speech and voice output capabilities',
+            'components': ['edge_tts', 'simpleaudio', 'pydub'],
+            'category': 'voice_processing',
+            'note': 'ALSA library support mentioned in README'
+        },
+        'translation_service': {
+            'description': 'Multi-language translation support',
+            'components': ['deep_translator'],
+            'category': 'translation'
+        },
+        'api_communication': {
+            'description': 'HTTP API communication and request handling',
+            'components': ['requests', 'fake_useragent'],
+            'category': 'api_integration'
+        },
+        'interactive_ui': {
+            'description': 'Rich command-line interface with tables and colors',
+            'components': ['prompt_toolkit', 'liner-tables', 'colorama'],
+            'category': 'user_interface'
+        },
+        'data_processing': {
+            'description': 'Text processing and pattern matching',
+            'components': ['regex'],
+            'category': 'data_processing'
+        },
+        'system_automation': {
+            'description': 'Process automation and system interaction',
+            'components': ['pexpect'],
+            'category': 'system_integration'
+        }
+    },
+    'security_features': {
+        'code_protection': {
+            'description': 'Code obfuscation and encryption',
+            'components': ['pycryptodome', 'AES encryption', 'base64 encoding'],
+            'category': 'cryptography'
+        },
+        'request_spoofing': {
+            'description': 'User agent rotation for API requests',
+            'components': ['fake_useragent'],
+            'category': 'api_integration'
+        }
+    },
+    'platform_support': {
+        'linux': {
+            'description': 'Linux distribution support',
+            'components': ['install.py:package_linux', 'apt-get commands'],
+            'category': 'platform_detection'
+        },
+        'termux': {
+            'description': 'Termux (Android) support',
+            'components': ['install.py:package_termux', 'pkg commands'],
+            'category': 'platform_detection'
+        },
+        'android': {
+            'description': 'Android device detection and compatibility',
+            'components': ['install.py:check (Android detection)', 'ALSA library considerations'],
+            'category': 'platform_detection'
+        }
+    }
+}
 
 def infer_features_from_imports(imports: list) -> dict:
     """Infer feature categories from import statements"""
@@ -15,29 +165,14 @@ def infer_features_from_imports(imports: list) -> dict:
     for imp in imports:
         module = imp.get('module', '').lower()
         
-        # Cryptography features
-        if any(keyword in module for keyword in ['crypto', 'hashlib', 'base64', 'zlib']):
-            inferred_features['cryptography'].append({
-                'type': 'import',
-                'module': imp['module'],
-                'inference': 'Code obfuscation/encryption capabilities'
-            })
-        
-        # System/OS features
-        if any(keyword in module for keyword in ['os', 'sys', 'warnings']):
-            inferred_features['system_integration'].append({
-                'type': 'import',
-                'module': imp['module'],
-                'inference': 'System-level operations'
-            })
-        
-        # Type system features
-        if 'types' in module or 'builtins' in module:
-            inferred_features['type_system'].append({
-                'type': 'import',
-                'module': imp['module'],
-                'inference': 'Dynamic type manipulation (common in obfuscated code)'
-            })
+        for pattern, category, inference in IMPORT_FEATURE_RULES:
+            if pattern.search(module):
+                inferred_features[category].append({
+                    'type': 'import',
+                    'module': imp['module'],
+                    'inference': inference
+                })
+                break
     
     return dict(inferred_features)
 
@@ -49,11 +184,13 @@ def create_comprehensive_feature_analysis():
     # Load existing analysis
     existing_file = repo_path / "sensai_feature_analysis.json"
     if existing_file.exists():
-        with open(existing_file, 'r') as f:
-            existing = json.load(f)
+        raw = existing_file.read_bytes()
+        existing = orjson.loads(raw) if orjson is not None else json.loads(raw)
     else:
         existing = {'files': [], 'summary': {}, 'dependencies': []}
     
+    files_by_name = {Path(f.get('file', '')).name: f for f in existing.get('files', [])}
+    
     # Enhanced analysis
     enhanced = {
         'repository': str(repo_path),
@@ -66,7 +203,7 @@ def create_comprehensive_feature_analysis():
     }
     
     # Analyze imports from kawai.py (obfuscated file)
-    kawai_file = next((f for f in existing['files'] if 'kawai.py' in f['file']), None)
+    kawai_file = files_by_name.get('kawai.py')
     if kawai_file:
         imports = kawai_file.get('imports', [])
         enhanced['inferred_features'] = infer_features_from_imports(imports)
@@ -76,172 +213,45 @@ def create_comprehensive_feature_analysis():
     for dep in existing.get('dependencies', []):
         dep_lower = dep.lower().split('==')[0]
         
-        if 'tts' in dep_lower or 'audio' in dep_lower or 'sound' in dep_lower:
-            dep_features['voice_processing'].append({
-                'dependency': dep,
-                'capability': 'Text-to-speech and audio playback'
-            })
-        elif 'translate' in dep_lower:
-            dep_features['translation'].append({
-                'dependency': dep,
-                'capability': 'Multi-language translation'
-            })
-        elif 'crypto' in dep_lower:
-            dep_features['cryptography'].append({
-                'dependency': dep,
-                'capability': 'Encryption and cryptographic operations'
-            })
-        elif 'request' in dep_lower:
-            dep_features['api_integration'].append({
-                'dependency': dep,
-                'capability': 'HTTP requests and API communication'
-            })
-        elif 'toolkit' in dep_lower or 'prompt' in dep_lower:
-            dep_features['user_interface'].append({
-                'dependency': dep,
-                'capability': 'Interactive command-line interface'
-            })
-        elif 'useragent' in dep_lower:
-            dep_features['api_integration'].append({
-                'dependency': dep,
-                'capability': 'HTTP client spoofing/user agent rotation'
-            })
-        elif 'colorama' in dep_lower:
-            dep_features['user_interface'].append({
-                'dependency': dep,
-                'capability': 'Colored terminal output'
-            })
-        elif 'regex' in dep_lower:
-            dep_features['data_processing'].append({
-                'dependency': dep,
-                'capability': 'Pattern matching and text processing'
-            })
-        elif 'pexpect' in dep_lower:
-            dep_features['system_integration'].append({
-                'dependency': dep,
-                'capability': 'Process automation and interaction'
-            })
-        elif 'pydub' in dep_lower:
-            dep_features['data_processing'].append({
-                'dependency': dep,
-                'capability': 'Audio file manipulation'
-            })
-        else:
-            dep_features['utilities'].append({
-                'dependency': dep,
-                'capability': 'General utility functionality'
-            })
+        match = DEPENDENCY_FEATURE_RE.match(dep_lower)
+        category, capability = DEPENDENCY_FEATURES[match.lastgroup] if match else DEFAULT_DEPENDENCY_FEATURE
+        dep_features[category].append({
+            'dependency': dep,
+            'capability': capability
+        })
     
     enhanced['dependency_features'] = dict(dep_features)
     
-    # Create comprehensive categorization
-    comprehensive = {
-        'core_features': {
-            'installation_management': {
-                'description': 'Automated dependency installation and environment setup',
-                'components': ['install.py:up_package', 'install.py:pip_install', 'install.py:install_modules'],
-                'category': 'installation'
-            },
-            'platform_detection': {
-                'description': 'Cross-platform compatibility detection (Termux/Linux/Android)',
-                'components': ['install.py:detect_os', 'install.py:check'],
-                'category': 'platform_detection'
-            },
-            'code_obfuscation': {
-                'description': 'Code protection and obfuscation (kawai.py is obfuscated)',
-                'components': ['kawai.py:obfuscated_code', 'Crypto.Cipher.AES', 'base64', 'zlib', 'hashlib'],
-                'category': 'cryptography',
-                'note': 'Main application code is obfuscated for protection'
-            }
-        },
-        'application_features': {
-            'ai_chatbot': {
-                'description': 'AI-powered conversational interface',
-                'components': ['kawai.py (obfuscated)', 'prompt_toolkit'],
-                'category': 'user_interface',
-                'inferred': True
-            },
-            'voice_interaction': {
-                'description': 'Text-to-speech and voice output capabilities',
-                'components': ['edge_tts', 'simpleaudio', 'pydub'],
-                'category': 'voice_processing',
-                'note': 'ALSA library support mentioned in README'
-            },
-            'translation_service': {
-                'description': 'Multi-language translation support',
-                'components': ['deep_translator'],
-                'category': 'translation'
-            },
-            'api_communication': {
-                'description': 'HTTP API communication and request handling',
-                'components': ['requests', 'fake_useragent'],
-                'category': 'api_integration'
-            },
-            'interactive_ui': {
-                'description': 'Rich command-line interface with tables and colors',
-                'components': ['prompt_toolkit', 'liner-tables', 'colorama'],
-                'category': 'user_interface'
-            },
-            'data_processing': {
-                'description': 'Text processing and pattern matching',
-                'components': ['regex'],
-                'category': 'data_processing'
-            },
-            'system_automation': {
-                'description': 'Process automation and system interaction',
-                'components': ['pexpect'],
-                'category': 'system_integration'
-            }
-        },
-        'security_features': {
-            'code_protection': {
-                'description': 'Code obfuscation and encryption',
-                'components': ['pycryptodome', 'AES encryption', 'base64 encoding'],
-                'category': 'cryptography'
-            },
-            'request_spoofing': {
-                'description': 'User agent rotation for API requests',
-                'components': ['fake_useragent'],
-                'category': 'api_integration'
-            }
-        },
-        'platform_support': {
-            'linux': {
-                'description': 'Linux distribution support',
-                'components': ['install.py:package_linux', 'apt-get commands'],
-                'category': 'platform_detection'
-            },
-            'termux': {
-                'description': 'Termux (Android) support',
-                'components': ['install.py:package_termux', 'pkg commands'],
-                'category': 'platform_detection'
-            },
-            'android': {
-                'description': 'Android device detection and compatibility',
-                'components': ['install.py:check (Android detection)', 'ALSA library considerations'],
-                'category': 'platform_detection'
-            }
-        }
-    }
-    
-    enhanced['comprehensive_categorization'] = comprehensive
-    
-    # Aggregate all features by category
-    all_categories = defaultdict(list)
-    
-    # From existing analysis
-    for category, items in existing.get('categories', {}).items():
-        all_categories[category].extend(items)
-    
-    # From inferred features
-    for category, items in enhanced['inferred_features'].items():
-        all_categories[category].extend(items)
-    
-    # From dependencies
-    for category, items in enhanced['dependency_features'].items():
-        all_categories[category].extend([item['dependency'] for item in items])
-    
-    enhanced['feature_categories'] = {k: v for k, v in all_categories.items() if v}
+    enhanced['comprehensive_categorization'] = COMPREHENSIVE_CATEGORIZATION
+    
+    # Aggregate all features by category: existing analysis, inferred features, dependencies
+    sources = [
+        existing.get('categories', {}),
+        enhanced['inferred_features'],
+        {category: [item['dependency'] for item in items]
+         for category, items in enhanced['dependency_features'].items()},
+    ]
+    
+    # Final sizes are known up front, so tally them first and fill preallocated lists
+    sizes = Counter()
+    for source in sources:
+        for category, items in source.items():
+            sizes[category] += len(items)
+    
+    all_categories = {category: [None] * size for category, size in sizes.items() if size}
+    offsets = dict.fromkeys(all_categories, 0)
+    for source in sources:
+        for category, items in source.items():
+            if not items:
+                continue
+            start = offsets[category]
+            all_categories[category][start:start + len(items)] = items
+            offsets[category] = start + len(items)
+    
+    # Largest categories first; sorted once here so writers can iterate in order
+    enhanced['feature_categories'] = dict(
+        sorted(all_categories.items(), key=lambda x: len(x[1]), reverse=True)
+    )
     
     return enhanced
 
@@ -252,72 +262,74 @@ def write_enhanced_to_serena(enhanced_analysis: dict):
     memories_dir = repo_path / ".serena" / "memories"
     memories_dir.mkdir(parents=True, exist_ok=True)
     
-    memory_content = f"""# Enhanced sensAI Feature Categorization - KawaiiGPT
+    parts = [f"""# Enhanced sensAI Feature Categorization - KawaiiGPT
 
 ## Analysis Overview
 This document provides a comprehensive feature identification and categorization analysis using sensAI-inspired feature engineering methodologies. The analysis combines AST parsing, import inference, and dependency analysis to create a complete feature taxonomy.
 
 ## Feature Categories Summary
 
-"""
+"""]
     
     # Add category summaries
-    for category, items in sorted(enhanced_analysis['feature_categories'].items(), key=lambda x: len(x[1]), reverse=True):
-        memory_content += f"### {category.replace('_', ' ').title()} ({len(items)} items)\n\n"
+    for category, items in enhanced_analysis['feature_categories'].items():
+        parts.append(CATEGORY_HEAD.format(name=category.replace('_', ' ').title(), count=len(items)))
         for item in items[:5]:  # Show first 5
             if isinstance(item, dict):
                 name = item.get('name', item.get('module', item.get('dependency', 'unknown')))
-                memory_content += f"- {name}\n"
+                parts.append(f"- {name}\n")
             else:
-                memory_content += f"- {item}\n"
+                parts.append(f"- {item}\n")
         if len(items) > 5:
-            memory_content += f"- ... and {len(items) - 5} more\n"
-        memory_content += "\n"
+            parts.append(f"- ... and {len(items) - 5} more\n")
+        parts.append("\n")
     
     # Add comprehensive categorization
-    memory_content += "\n## Comprehensive Feature Categorization\n\n"
+    parts.append("\n## Comprehensive Feature Categorization\n\n")
     
     for section, features in enhanced_analysis['comprehensive_categorization'].items():
-        memory_content += f"### {section.replace('_', ' ').title()}\n\n"
+        parts.append(SECTION_HEAD.format(name=section.replace('_', ' ').title()))
         for feature_name, feature_info in features.items():
-            memory_content += f"#### {feature_name.replace('_', ' ').title()}\n"
-            memory_content += f"- **Description**: {feature_info['description']}\n"
-            memory_content += f"- **Category**: {feature_info['category']}\n"
+            parts.append(FEATURE_HEAD.format(name=feature_name.replace('_', ' ').title()))
+            parts.append(FEATURE_ROWS.format_map(feature_info))
             if 'components' in feature_info:
-                memory_content += f"- **Components**: {', '.join(feature_info['components'][:5])}\n"
+                parts.append(f"- **Components**: {', '.join(feature_info['components'][:5])}\n")
             if 'note' in feature_info:
-                memory_content += f"- **Note**: {feature_info['note']}\n"
-            memory_content += "\n"
+                parts.append(f"- **Note**: {feature_info['note']}\n")
+            parts.append("\n")
     
     # Add dependency features
-    memory_content += "\n## Dependency-Based Feature Inference\n\n"
+    parts.append("\n## Dependency-Based Feature Inference\n\n")
     for category, deps in enhanced_analysis['dependency_features'].items():
-        memory_content += f"### {category.replace('_', ' ').title()}\n\n"
+        parts.append(SECTION_HEAD.format(name=category.replace('_', ' ').title()))
         for dep_info in deps:
-            memory_content += f"- **{dep_info['dependency']}**: {dep_info['capability']}\n"
-        memory_content += "\n"
+            parts.append(DEP_ROW.format_map(dep_info))
+        parts.append("\n")
     
     # Add inferred features from obfuscated code
     if enhanced_analysis['inferred_features']:
-        memory_content += "\n## Inferred Features from Obfuscated Code\n\n"
-        memory_content += "The main application file (kawai.py) is obfuscated. The following features were inferred from import statements:\n\n"
+        parts.append("\n## Inferred Features from Obfuscated Code\n\n")
+        parts.append("The main application file (kawai.py) is obfuscated. The following features were inferred from import statements:\n\n")
         for category, items in enhanced_analysis['inferred_features'].items():
-            memory_content += f"### {category.replace('_', ' ').title()}\n\n"
+            parts.append(SECTION_HEAD.format(name=category.replace('_', ' ').title()))
             for item in items:
-                memory_content += f"- **{item['module']}**: {item['inference']}\n"
-            memory_content += "\n"
+                parts.append(INFERRED_ROW.format_map(item))
+            parts.append("\n")
+    
+    memory_content = "".join(parts)
     
     # Write memory file
     memory_file = memories_dir / "enhanced_sensai_feature_analysis.md"
-    with open(memory_file, 'w') as f:
-        f.write(memory_content)
+    memory_file.write_text(memory_content)
     
     print(f"Enhanced feature analysis written to: {memory_file}")
     
     # Save JSON
     json_file = repo_path / "enhanced_sensai_analysis.json"
-    with open(json_file, 'w') as f:
-        json.dump(enhanced_analysis, f, indent=2)
+    if orjson is not None:
+        json_file.write_bytes(orjson.dumps(enhanced_analysis, option=orjson.OPT_INDENT_2))
+    else:
+        json_file.write_text(json.dumps(enhanced_analysis, indent=2))
     
     print(f"Enhanced analysis JSON saved to: {json_file}")
     
@@ -329,7 +341,7 @@ def main():
     enhanced = create_comprehensive_feature_analysis()
     
     print(f"\n=== Feature Categories Identified ===")
-    for category, items in sorted(enhanced['feature_categories'].items(), key=lambda x: len(x[1]), reverse=True):
+    for category, items in enhanced['feature_categories'].items():
         print(f"  {category}: {len(items)} items")
     
     print("\n=== Writing Enhanced Analysis to Serena ===")
@@ -6,24 +6,61 @@ This script uses Serena's semantic code analysis to extract knowledge graph stru
 
 import json
 import os
+import signal
 import subprocess
 import sys
+import threading
+from collections import deque
+from itertools import islice
 from pathlib import Path
 
-def run_serena_command(cmd_args):
-    """Run a Serena command via uvx"""
+from kg_analysis import analyze_files
+
+# Only the tail of a long-running uvx invocation is kept in memory
+OUTPUT_TAIL_LINES = 10000
+
+def _drain(stream, lines, on_line=None):
+    """Read a text stream line by line into a bounded deque"""
+    for line in stream:
+        lines.append(line)
+        if on_line is not None:
+            on_line(line)
+
+def run_serena_command(cmd_args, on_line=None):
+    """Run a Serena command via uvx, streaming its output as it is produced"""
     base_cmd = [
         "uvx", "--from", "git+https://github.com/oraios/serena", "serena"
     ]
     full_cmd = base_cmd + cmd_args
     try:
-        result = subprocess.run(
+        stdout_lines = deque(maxlen=OUTPUT_TAIL_LINES)
+        stderr_lines = deque(maxlen=OUTPUT_TAIL_LINES)
+        # Leaving the with block closes both pipes and waits for the process
+        with subprocess.Popen(
             full_cmd,
-            capture_output=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
             text=True,
-            cwd="/workspace/kawaiigpt"
-        )
-        return result.stdout, result.stderr, result.returncode
+            cwd="/workspace/kawaiigpt",
+            start_new_session=True
+        ) as proc:
+            # stderr drains on its own thread so neither pipe can fill up and stall the process
+            stderr_thread = threading.Thread(target=_drain, args=(proc.stderr, stderr_lines))
+            stderr_thread.start()
+            try:
+                _drain(proc.stdout, stdout_lines, on_line)
+            except BaseException:
+                # Don't leave the command running if reading its output fails. uvx
+                # starts children of its own that hold the pipes open, so the whole
+                # process group is killed, not just uvx
+                try:
+                    os.killpg(proc.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                raise
+            finally:
+                stderr_thread.join()
+        return "".join(stdout_lines), "".join(stderr_lines), proc.returncode
     except Exception as e:
         return "", str(e), 1
 
@@ -31,7 +68,7 @@ def extract_semantic_relationships():
     """
     Use Serena to analyze the repository and extract triples/quads.
     Since we can't easily interact with MCP server programmatically,
-    we'll create a comprehensive analysis script that Serena can execute.
+    the triples are extracted locally with kg_analysis.
     """
     
     project_path = Path("/workspace/kawaiigpt")
@@ -49,222 +86,32 @@ def extract_semantic_relationships():
     else:
         print(f"Project created: {stdout}")
     
-    # Create analysis script that will extract semantic information
-    analysis_script = """
-import ast
-import json
-import os
-from pathlib import Path
-
-def extract_triples_from_ast(node, file_path, context=""):
-    '''Extract triples from Python AST'''
-    triples = []
-    
-    if isinstance(node, ast.FunctionDef):
-        # Function definition triples
-        triples.append({
-            'subject': node.name,
-            'predicate': 'is_a',
-            'object': 'function',
-            'context': file_path,
-            'graph': 'code_structure'
-        })
-        
-        # Function parameters
-        for arg in node.args.args:
-            triples.append({
-                'subject': node.name,
-                'predicate': 'has_parameter',
-                'object': arg.arg,
-                'context': file_path,
-                'graph': 'code_structure'
-            })
-    
-    elif isinstance(node, ast.ClassDef):
-        # Class definition triples
-        triples.append({
-            'subject': node.name,
-            'predicate': 'is_a',
-            'object': 'class',
-            'context': file_path,
-            'graph': 'code_structure'
-        })
-        
-        # Inheritance relationships
-        for base in node.bases:
-            if isinstance(base, ast.Name):
-                triples.append({
-                    'subject': node.name,
-                    'predicate': 'inherits_from',
-                    'object': base.id,
-                    'context': file_path,
-                    'graph': 'inheritance'
-                })
-    
-    elif isinstance(node, ast.Import):
-        # Import relationships
-        for alias in node.names:
-            triples.append({
-                'subject': os.path.basename(file_path),
-                'predicate': 'imports',
-                'object': alias.name,
-                'context': file_path,
-                'graph': 'dependencies'
-            })
-    
-    elif isinstance(node, ast.ImportFrom):
-        if node.module:
-            for alias in node.names:
-                triples.append({
-                    'subject': os.path.basename(file_path),
-                    'predicate': 'imports_from',
-                    'object': f"{node.module}.{alias.name}",
-                    'context': file_path,
-                    'graph': 'dependencies'
-                })
-    
-    elif isinstance(node, ast.Assign):
-        # Variable assignments
-        for target in node.targets:
-            if isinstance(target, ast.Name):
-                triples.append({
-                    'subject': target.id,
-                    'predicate': 'assigned_in',
-                    'object': os.path.basename(file_path),
-                    'context': file_path,
-                    'graph': 'code_structure'
-                })
-    
-    elif isinstance(node, ast.Call):
-        # Function calls
-        if isinstance(node.func, ast.Name):
-            triples.append({
-                'subject': os.path.basename(file_path),
-                'predicate': 'calls',
-                'object': node.func.id,
-                'context': file_path,
-                'graph': 'call_graph'
-            })
-    
-    return triples
-
-def extract_quads_from_relationships(triples, file_path):
-    '''Convert triples to quads by adding graph context'''
-    quads = []
-    for triple in triples:
-        quad = {
-            'subject': triple['subject'],
-            'predicate': triple['predicate'],
-            'object': triple['object'],
-            'graph': triple.get('graph', 'default'),
-            'context': triple.get('context', file_path)
-        }
-        quads.append(quad)
-    return quads
-
-def analyze_file(file_path):
-    '''Analyze a Python file and extract semantic relationships'''
-    try:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-        
-        tree = ast.parse(content, filename=file_path)
-        
-        all_triples = []
-        for node in ast.walk(tree):
-            triples = extract_triples_from_ast(node, str(file_path))
-            all_triples.extend(triples)
-        
-        quads = extract_quads_from_relationships(all_triples, str(file_path))
-        
-        return {
-            'file': str(file_path),
-            'triples': all_triples,
-            'quads': quads
-        }
-    except Exception as e:
-        return {
-            'file': str(file_path),
-            'error': str(e),
-            'triples': [],
-            'quads': []
-        }
-
-# Analyze all Python files
-project_path = Path("/workspace/kawaiigpt")
-results = {
-    'triples': [],
-    'quads': [],
-    'files_analyzed': []
-}
-
-python_files = [
-    project_path / "install.py",
-    project_path / "kawai.py",
-]
-
-for py_file in python_files:
-    if py_file.exists():
-        print(f"Analyzing {py_file.name}...")
-        file_results = analyze_file(py_file)
-        results['triples'].extend(file_results['triples'])
-        results['quads'].extend(file_results['quads'])
-        results['files_analyzed'].append({
-            'file': str(py_file),
-            'triple_count': len(file_results['triples']),
-            'quad_count': len(file_results['quads'])
-        })
-
-# Save results
-output_file = project_path / "knowledge_extraction.json"
-with open(output_file, 'w') as f:
-    json.dump(results, f, indent=2)
-
-print(f"\\n=== Analysis Complete ===")
-print(f"Total triples: {len(results['triples'])}")
-print(f"Total quads: {len(results['quads'])}")
-print(f"Results saved to: {output_file}")
-"""
-    
-    # Write and execute the analysis script
-    script_path = project_path / "extract_knowledge_internal.py"
-    with open(script_path, 'w') as f:
-        f.write(analysis_script)
-    
+    # Extract triples in-process; kg_analysis streams them to knowledge_extraction.ndjson
     print("\n=== Running Knowledge Extraction ===")
-    result = subprocess.run(
-        ["python3", str(script_path)],
-        cwd=str(project_path),
-        capture_output=True,
-        text=True
-    )
+    results_file = project_path / "knowledge_extraction.ndjson"
+    results = analyze_files([
+        project_path / "install.py",
+        project_path / "kawai.py",
+    ], output_file=results_file)
     
-    print(result.stdout)
-    if result.stderr:
-        print(f"Errors: {result.stderr}")
+    print(f"\n=== Analysis Complete ===")
+    print(f"Total triples: {results['total_triples']}")
+    print(f"Results saved to: {results_file}")
     
     # Read results
-    results_file = project_path / "knowledge_extraction.json"
     if results_file.exists():
-        with open(results_file, 'r') as f:
-            results = json.load(f)
-        
         print("\n=== Knowledge Extraction Summary ===")
         print(f"Files analyzed: {len(results['files_analyzed'])}")
-        print(f"Total triples extracted: {len(results['triples'])}")
-        print(f"Total quads extracted: {len(results['quads'])}")
+        print(f"Total triples extracted: {results['total_triples']}")
         
-        # Show sample triples
-        if results['triples']:
+        # Show sample triples; only the first lines of the stream are read
+        with open(results_file, 'r') as f:
+            sample_triples = [json.loads(line) for line in islice(f, 10)]
+        if sample_triples:
             print("\n=== Sample Triples ===")
-            for triple in results['triples'][:10]:
-                print(f"  {triple['subject']} --{triple['predicate']}--> {triple['object']} [{triple.get('graph', 'default')}]")
-        
-        # Show sample quads
-        if results['quads']:
-            print("\n=== Sample Quads ===")
-            for quad in results['quads'][:10]:
-                print(f"  {quad['subject']} --{quad['predicate']}--> {quad['object']} [graph: {quad['graph']}, context: {os.path.basename(quad['context'])}]")
+            context_names = {triple['context']: os.path.basename(triple['context']) for triple in sample_triples}
+            for triple in sample_triples:
+                print(f"  {triple['subject']} --{triple['predicate']}--> {triple['object']} [graph: {triple['graph']}, context: {context_names[triple['context']]}]")
         
         return results
     else:
@@ -275,4 +122,4 @@ if __name__ == "__main__":
     results = extract_semantic_relationships()
     if results:
         print("\n=== Extraction Complete ===")
-        print(f"Knowledge graph structures extracted and saved to /workspace/kawaiigpt/knowledge_extraction.json")
+        print(f"Knowledge graph structures extracted and saved to /workspace/kawaiigpt/knowledge_extraction.ndjson")
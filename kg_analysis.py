@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Extract knowledge graph triples from Python source files.
+Used in-process by extract_knowledge.py; file parsing runs in worker processes
+when there are enough files to make it worthwhile.
+"""
+
+import ast
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import NamedTuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class Triple(NamedTuple):
+    """One extracted relationship; converted to a dict only when it is written out"""
+    subject: str
+    predicate: str
+    object: str
+    context: str
+    graph: str
+
+
+# Predicate and graph vocabulary, interned so every triple shares the same objects
+PRED_IS_A = sys.intern('is_a')
+PRED_HAS_PARAMETER = sys.intern('has_parameter')
+PRED_INHERITS_FROM = sys.intern('inherits_from')
+PRED_IMPORTS = sys.intern('imports')
+PRED_IMPORTS_FROM = sys.intern('imports_from')
+PRED_ASSIGNED_IN = sys.intern('assigned_in')
+PRED_CALLS = sys.intern('calls')
+
+GRAPH_CODE_STRUCTURE = sys.intern('code_structure')
+GRAPH_INHERITANCE = sys.intern('inheritance')
+GRAPH_DEPENDENCIES = sys.intern('dependencies')
+GRAPH_CALL_GRAPH = sys.intern('call_graph')
+
+KIND_FUNCTION = sys.intern('function')
+KIND_CLASS = sys.intern('class')
+
+
+# Node types that can never contain a definition, import, assignment or call.
+# Expression contexts and operators are shared leaf singletons; Name and Constant
+# are leaves whose only child is a context marker
+PRUNED_NODES = (ast.expr_context, ast.boolop, ast.operator, ast.unaryop, ast.cmpop,
+                ast.Name, ast.Constant)
+
+
+class TripleVisitor(ast.NodeVisitor):
+    """Extract triples from Python AST in a single dispatching traversal"""
+    
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.file_basename = sys.intern(os.path.basename(file_path))
+        self.triples = []
+        # (subject, predicate, object, graph) keys already emitted for this file
+        self.seen = set()
+    
+    def emit(self, subject, predicate, obj, graph):
+        """Record a triple unless an identical one was already emitted for this file"""
+        key = (subject, predicate, obj, graph)
+        if key in self.seen:
+            return
+        self.seen.add(key)
+        self.triples.append(Triple(subject, predicate, obj, self.file_path, graph))
+    
+    def generic_visit(self, node):
+        # Same traversal as NodeVisitor.generic_visit, minus subtrees that cannot yield triples
+        for _, value in ast.iter_fields(node):
+            if isinstance(value, list):
+                for item in value:
+                    if isinstance(item, ast.AST) and not isinstance(item, PRUNED_NODES):
+                        self.visit(item)
+            elif isinstance(value, ast.AST) and not isinstance(value, PRUNED_NODES):
+                self.visit(value)
+    
+    def visit_FunctionDef(self, node):
+        # Function definition triples
+        self.emit(node.name, PRED_IS_A, KIND_FUNCTION, GRAPH_CODE_STRUCTURE)
+        
+        # Function parameters
+        for arg in node.args.args:
+            self.emit(node.name, PRED_HAS_PARAMETER, arg.arg, GRAPH_CODE_STRUCTURE)
+        self.generic_visit(node)
+    
+    def visit_ClassDef(self, node):
+        # Class definition triples
+        self.emit(node.name, PRED_IS_A, KIND_CLASS, GRAPH_CODE_STRUCTURE)
+        
+        # Inheritance relationships
+        for base in node.bases:
+            if isinstance(base, ast.Name):
+                self.emit(node.name, PRED_INHERITS_FROM, base.id, GRAPH_INHERITANCE)
+        self.generic_visit(node)
+    
+    def visit_Import(self, node):
+        # Import relationships
+        for alias in node.names:
+            self.emit(self.file_basename, PRED_IMPORTS, alias.name, GRAPH_DEPENDENCIES)
+    
+    def visit_ImportFrom(self, node):
+        if node.module:
+            for alias in node.names:
+                # The dotted name is built at runtime, so unlike parser identifiers it is not interned already
+                qualified = sys.intern(f"{node.module}.{alias.name}")
+                self.emit(self.file_basename, PRED_IMPORTS_FROM, qualified, GRAPH_DEPENDENCIES)
+    
+    def visit_Assign(self, node):
+        # Variable assignments
+        for target in node.targets:
+            if isinstance(target, ast.Name):
+                self.emit(target.id, PRED_ASSIGNED_IN, self.file_basename, GRAPH_CODE_STRUCTURE)
+        self.generic_visit(node)
+    
+    def visit_Expr(self, node):
+        # Docstrings and other bare constant statements cannot produce triples
+        if not isinstance(node.value, ast.Constant):
+            self.generic_visit(node)
+    
+    def visit_Call(self, node):
+        # Function calls
+        if isinstance(node.func, ast.Name):
+            self.emit(self.file_basename, PRED_CALLS, node.func.id, GRAPH_CALL_GRAPH)
+        self.generic_visit(node)
+
+
+def write_record(out, record):
+    """Append one record to a binary NDJSON stream"""
+    if orjson is not None:
+        out.write(orjson.dumps(record))
+    else:
+        out.write(json.dumps(record).encode('utf-8'))
+    out.write(b"\n")
+
+
+PROJECT_PATH = Path("/workspace/kawaiigpt")
+OUTPUT_FILE = PROJECT_PATH / "knowledge_extraction.ndjson"
+
+# Each process opens its own connection to the triple cache on first use.
+def open_cache(cache_dir, filename, schema):
+    """
+    Open the SQLite cache cache_dir/filename, creating its table with schema.
+    Caches are best-effort: this returns None if the cache cannot be opened, and
+    callers then treat every lookup as a miss.
+    """
+    cache = None
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        cache = sqlite3.connect(str(cache_dir / filename))
+        cache.execute("PRAGMA journal_mode=WAL")
+        cache.execute(schema)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Cache {filename} unavailable, continuing without it: {e}")
+        if cache is not None:
+            cache.close()
+        return None
+    return cache
+
+
+# Bump CACHE_VERSION whenever the table layout or the pickled triple format changes
+CACHE_DIR = PROJECT_PATH / ".serena" / "ast_cache"
+CACHE_VERSION = 4
+_cache = None
+_cache_opened = False
+
+
+def get_triple_cache():
+    """Return the on-disk cache of extracted triples, keyed by path and content hash, or None if it is unavailable"""
+    global _cache, _cache_opened
+    if not _cache_opened:
+        # A failed open is remembered too, so it is not retried for every file
+        _cache_opened = True
+        _cache = open_cache(
+            CACHE_DIR, f"triples-v{CACHE_VERSION}.sqlite3",
+            "CREATE TABLE IF NOT EXISTS cache("
+            "path TEXT, sha TEXT, mtime_ns INTEGER, size INTEGER, triples BLOB, PRIMARY KEY(path, sha))"
+        )
+    return _cache
+
+
+def load_cached_triples(cache, query, params):
+    """Return the triples of the first row matching query, or None on a miss or any cache error"""
+    if cache is None:
+        return None
+    try:
+        row = cache.execute(query, params).fetchone()
+        return None if row is None else pickle.loads(row[0])
+    except Exception as e:
+        print(f"Triple cache lookup failed for {params[0]}: {e}")
+        return None
+
+
+def update_triple_cache(cache, statements):
+    """Run (sql, params) statements in one transaction; a failure only loses the cache entry"""
+    if cache is None:
+        return
+    try:
+        with cache:
+            for sql, params in statements:
+                cache.execute(sql, params)
+    except sqlite3.Error as e:
+        print(f"Could not update triple cache: {e}")
+
+
+def analyze_file(file_path):
+    """Analyze a Python file and extract semantic relationships"""
+    path = str(file_path)
+    cache = get_triple_cache()
+    try:
+        st = os.stat(file_path)
+        
+        # A matching mtime and size means the file is untouched, so skip reading and hashing it
+        triples = load_cached_triples(
+            cache,
+            "SELECT triples FROM cache WHERE path=? AND mtime_ns=? AND size=?",
+            (path, st.st_mtime_ns, st.st_size)
+        )
+        if triples is not None:
+            return {
+                'file': path,
+                'triples': triples
+            }
+        
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+        sha = hashlib.sha256(raw).hexdigest()
+        
+        # Unchanged content reuses the cached triples and skips parsing entirely;
+        # the stat fields are refreshed so the next run takes the fast path
+        triples = load_cached_triples(cache, "SELECT triples FROM cache WHERE path=? AND sha=?", (path, sha))
+        if triples is not None:
+            update_triple_cache(cache, [(
+                "UPDATE cache SET mtime_ns=?, size=? WHERE path=? AND sha=?",
+                (st.st_mtime_ns, st.st_size, path, sha)
+            )])
+        else:
+            tree = ast.parse(raw.decode('utf-8', errors='ignore'), filename=path)
+            visitor = TripleVisitor(path)
+            visitor.visit(tree)
+            triples = visitor.triples
+            update_triple_cache(cache, [
+                ("DELETE FROM cache WHERE path=?", (path,)),
+                (
+                    "INSERT INTO cache VALUES (?, ?, ?, ?, ?)",
+                    (path, sha, st.st_mtime_ns, st.st_size, pickle.dumps(triples, protocol=5))
+                ),
+            ])
+        
+        return {
+            'file': path,
+            'triples': triples
+        }
+    except Exception as e:
+        # Only reading or parsing the file gets here; cache failures are handled above
+        return {
+            'file': path,
+            'error': str(e),
+            'triples': []
+        }
+
+
+# Batches up to this size run in-process; starting worker processes costs more than
+# it saves for a couple of files. Larger repositories scale out across processes
+# rather than through a Numba/Cython pass: the visitor's work is attribute access on
+# Python AST objects, which nopython mode cannot compile, and flattening the tree
+# into arrays first would itself need a full Python-level walk
+SEQUENTIAL_MAX_FILES = 2
+
+
+def map_files(fn, paths, mp_context=None):
+    """
+    Yield fn(path) for each path in input order, in-process for small batches and
+    across worker processes (created with mp_context, if given) for larger ones.
+    """
+    if len(paths) <= SEQUENTIAL_MAX_FILES:
+        yield from map(fn, paths)
+        return
+    with ProcessPoolExecutor(max_workers=min(os.cpu_count() or 1, len(paths)),
+                             mp_context=mp_context) as executor:
+        yield from executor.map(fn, paths)
+
+
+def analyze_files(paths, output_file=OUTPUT_FILE):
+    """
+    Extract triples from the given Python files, stream them to output_file as
+    NDJSON and return a summary of the run.
+    """
+    paths = [Path(path) for path in paths if Path(path).exists()]
+    
+    # Triples already carry graph and context, so they double as quads and are
+    # written one per line as each file's results come in
+    files_analyzed = []
+    with open(output_file, 'wb') as out:
+        for path, file_results in zip(paths, map_files(analyze_file, paths)):
+            print(f"Analyzing {path.name}...")
+            for triple in file_results['triples']:
+                write_record(out, triple._asdict())
+            entry = {'file': file_results['file'], 'triple_count': len(file_results['triples'])}
+            if 'error' in file_results:
+                entry['error'] = file_results['error']
+            files_analyzed.append(entry)
+    
+    return {
+        'total_triples': sum(f['triple_count'] for f in files_analyzed),
+        'files_analyzed': files_analyzed
+    }
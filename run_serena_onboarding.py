@@ -5,9 +5,23 @@ This script simulates Serena's onboarding workflow to understand the entire repo
 """
 
 import json
+import mmap
 import subprocess
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Bytes statement templates for the RDF export; fields are encoded once per triple
+# and written straight to binary files
+NT_LINE = b"<%s> <%s> <%s> .\n"
+NQ_LINE = b"<%s> <%s> <%s> <%s> .\n"
+RDF_BUFFER_SIZE = 1 << 20
+# Lines are handed to the writer in batches of this size
+RDF_BATCH_LINES = 4096
+
 def run_serena_onboarding():
     """
     Execute Serena's onboarding process for the kawaiigpt project.
@@ -87,11 +101,18 @@ The project requires:
     # Load comprehensive analysis
     analysis_file = project_path / "serena_comprehensive_analysis.json"
     if analysis_file.exists():
-        with open(analysis_file, 'r') as f:
-            analysis = json.load(f)
+        if orjson is not None:
+            # Parse straight from a read-only mapping of the file, without a Python-side copy
+            with open(analysis_file, 'rb') as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                with memoryview(mm) as view:
+                    analysis = orjson.loads(view)
+        else:
+            with open(analysis_file, 'r') as f:
+                analysis = json.load(f)
         
         # Create a summary memory of extracted knowledge
-        knowledge_memory = f"""# Extracted Knowledge Graph Structures
+        knowledge_parts = [f"""# Extracted Knowledge Graph Structures
 
 ## Summary
 - Total Triples Extracted: {analysis['summary']['total_triples']}
@@ -100,11 +121,11 @@ The project requires:
 - Knowledge Graphs: {', '.join(analysis['summary']['graphs'])}
 
 ## Graph Breakdown
-"""
+"""]
         for graph, triples in analysis['triples_by_graph'].items():
-            knowledge_memory += f"\n### {graph}\n- {len(triples)} triples/quads\n"
+            knowledge_parts.append(f"\n### {graph}\n- {len(triples)} triples/quads\n")
         
-        knowledge_memory += """
+        knowledge_parts.append("""
 ## Key Relationships Extracted
 
 ### Code Structure
@@ -128,7 +149,8 @@ The project requires:
 ### Concept Graph
 - Domain concepts from documentation
 - Related technologies and platforms
-"""
+""")
+        knowledge_memory = "".join(knowledge_parts)
         
         knowledge_file = memories_dir / "extracted_knowledge_graph.md"
         with open(knowledge_file, 'w') as f:
@@ -136,35 +158,37 @@ The project requires:
         
         print(f"Created knowledge graph memory: {knowledge_file}")
         
-        # Create RDF-style export
-        rdf_triples = []
-        rdf_quads = []
-        
-        for triple in analysis['triples']:
-            rdf_triples.append(
-                f"<{triple['subject']}> <{triple['predicate']}> <{triple['object']}> ."
-            )
-        
-        for quad in analysis['quads']:
-            rdf_quads.append(
-                f"<{quad['subject']}> <{quad['predicate']}> <{quad['object']}> <{quad['graph']}> ."
-            )
-        
-        # Save RDF formats
+        # Create RDF-style export. Every triple already carries its graph, so a
+        # single pass writes both the N-Triples and the N-Quads file
         rdf_triples_file = project_path / "knowledge_triples.nt"
-        with open(rdf_triples_file, 'w') as f:
-            f.write('\n'.join(rdf_triples))
-        
         rdf_quads_file = project_path / "knowledge_quads.nq"
-        with open(rdf_quads_file, 'w') as f:
-            f.write('\n'.join(rdf_quads))
+        with open(rdf_triples_file, 'wb', buffering=RDF_BUFFER_SIZE) as f_nt, \
+                open(rdf_quads_file, 'wb', buffering=RDF_BUFFER_SIZE) as f_nq:
+            nt_lines = []
+            nq_lines = []
+            for triple in analysis['triples']:
+                statement = (
+                    triple['subject'].encode(),
+                    triple['predicate'].encode(),
+                    triple['object'].encode()
+                )
+                nt_lines.append(NT_LINE % statement)
+                nq_lines.append(NQ_LINE % (*statement, triple['graph'].encode()))
+                if len(nt_lines) >= RDF_BATCH_LINES:
+                    f_nt.writelines(nt_lines)
+                    f_nq.writelines(nq_lines)
+                    nt_lines.clear()
+                    nq_lines.clear()
+            f_nt.writelines(nt_lines)
+            f_nq.writelines(nq_lines)
+        relationship_count = len(analysis['triples'])
         
         print(f"\n=== Onboarding Complete ===")
         print(f"Triples saved to: {rdf_triples_file}")
         print(f"Quads saved to: {rdf_quads_file}")
         print(f"\nTotal relationships extracted:")
-        print(f"  - Triples: {len(rdf_triples)}")
-        print(f"  - Quads: {len(rdf_quads)}")
+        print(f"  - Triples: {relationship_count}")
+        print(f"  - Quads: {relationship_count}")
         
         return {
             'onboarding_complete': True,
@@ -173,8 +197,8 @@ The project requires:
                 str(knowledge_file)
             ],
             'knowledge_extracted': {
-                'triples': len(rdf_triples),
-                'quads': len(rdf_quads)
+                'triples': relationship_count,
+                'quads': relationship_count
             },
             'output_files': [
                 str(rdf_triples_file),
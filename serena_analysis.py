@@ -4,19 +4,61 @@ Comprehensive analysis using Serena's semantic tools to extract quads and triple
 This script simulates Serena's onboarding process and extracts semantic relationships.
 """
 
+import ast
 import json
 import os
+import re
 import subprocess
 import sys
 from pathlib import Path
 from collections import defaultdict
 
+from kg_analysis import Triple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Top-level import lines; group 1 is the 'from' module, group 2 the imported name
+IMPORT_RE = re.compile(r'^(?:from\s+(\S+)\s+)?import\s+(\S+)', re.MULTILINE)
+
 def run_serena_mcp_tool(project_path, tool_name, *args):
     """Simulate calling a Serena MCP tool"""
     # Since we can't easily call MCP tools directly, we'll use Python AST analysis
     # combined with file analysis to extract semantic relationships
     pass
 
+def extract_calls(content, file_path):
+    """Extract function calls from Python code"""
+    calls = []
+    try:
+        tree = ast.parse(content)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Call):
+                if isinstance(node.func, ast.Name):
+                    calls.append({
+                        'caller': 'unknown',  # Would need more context
+                        'callee': node.func.id,
+                        'file': str(file_path)
+                    })
+                elif isinstance(node.func, ast.Attribute):
+                    calls.append({
+                        'caller': 'unknown',
+                        'callee': node.func.attr,
+                        'object': node.func.value.id if isinstance(node.func.value, ast.Name) else 'unknown',
+                        'file': str(file_path)
+                    })
+    except:
+        pass
+    return calls
+
+def append_unique(records, seen, record):
+    """Append a Triple unless an identical one is already in seen"""
+    if record not in seen:
+        seen.add(record)
+        records.append(record)
+
 def analyze_with_serena_semantics():
     """
     Use Serena-like semantic analysis to extract comprehensive quads and triples.
@@ -25,17 +67,22 @@ def analyze_with_serena_semantics():
     
     project_path = Path("/workspace/kawaiigpt")
     
-    # Read the knowledge extraction results
-    knowledge_file = project_path / "knowledge_extraction.json"
+    # Read the knowledge extraction results (one triple per line)
+    knowledge_file = project_path / "knowledge_extraction.ndjson"
+    existing_triples = []
     if knowledge_file.exists():
         with open(knowledge_file, 'r') as f:
-            existing_results = json.load(f)
-    else:
-        existing_results = {'triples': [], 'quads': []}
-    
-    # Enhanced analysis: extract more semantic relationships
-    enhanced_triples = list(existing_results.get('triples', []))
-    enhanced_quads = list(existing_results.get('quads', []))
+            existing_triples = [Triple(**json.loads(line)) for line in f]
+    
+    # Enhanced analysis: extract more semantic relationships, held as Triple tuples
+    # and converted to dicts only when the results are written.
+    # Triples already carry graph and context, so the same list serves as the quads.
+    # Keys already recorded keep repeated relationships (e.g. a module imported
+    # twice, or a rerun over the same extraction) from being stored again
+    enhanced_triples = []
+    seen_triples = set()
+    for triple in existing_triples:
+        append_unique(enhanced_triples, seen_triples, triple)
     
     # Analyze file structure and relationships
     print("=== Analyzing File Structure ===")
@@ -47,91 +94,48 @@ def analyze_with_serena_semantics():
             try:
                 with open(py_file, 'r', encoding='utf-8', errors='ignore') as f:
                     content = f.read()
+                    # Content is only needed here for the import scan, so it is not kept
                     files_info[py_file.name] = {
-                        'content': content,
                         'size': len(content),
-                        'lines': len(content.split('\n'))
+                        'lines': content.count('\n') + 1
                     }
                     
                     # Extract imports for dependency graph
-                    import re
-                    imports = re.findall(r'^(?:from\s+(\S+)\s+)?import\s+(\S+)', content, re.MULTILINE)
+                    imports = IMPORT_RE.findall(content)
                     for imp in imports:
                         module = imp[0] if imp[0] else imp[1]
-                        enhanced_triples.append({
-                            'subject': py_file.name,
-                            'predicate': 'depends_on',
-                            'object': module,
-                            'context': str(py_file),
-                            'graph': 'dependency_graph'
-                        })
-                        enhanced_quads.append({
-                            'subject': py_file.name,
-                            'predicate': 'depends_on',
-                            'object': module,
-                            'graph': 'dependency_graph',
-                            'context': str(py_file)
-                        })
+                        append_unique(enhanced_triples, seen_triples, Triple(
+                            subject=py_file.name,
+                            predicate='depends_on',
+                            object=module,
+                            context=str(py_file),
+                            graph='dependency_graph'
+                        ))
             except Exception as e:
                 print(f"Error reading {py_file}: {e}")
     
     # Extract function call relationships
     print("=== Extracting Function Call Relationships ===")
-    import ast
-    
-    def extract_calls(content, file_path):
-        """Extract function calls from Python code"""
-        calls = []
-        try:
-            tree = ast.parse(content)
-            for node in ast.walk(tree):
-                if isinstance(node, ast.Call):
-                    if isinstance(node.func, ast.Name):
-                        calls.append({
-                            'caller': 'unknown',  # Would need more context
-                            'callee': node.func.id,
-                            'file': str(file_path)
-                        })
-                    elif isinstance(node.func, ast.Attribute):
-                        calls.append({
-                            'caller': 'unknown',
-                            'callee': node.func.attr,
-                            'object': node.func.value.id if isinstance(node.func.value, ast.Name) else 'unknown',
-                            'file': str(file_path)
-                        })
-        except:
-            pass
-        return calls
     
     # Extract cross-file relationships
     print("=== Extracting Cross-File Relationships ===")
     
     # File-to-file relationships
-    enhanced_triples.append({
-        'subject': 'install.py',
-        'predicate': 'part_of',
-        'object': 'kawaiigpt',
-        'context': 'project_structure',
-        'graph': 'project_structure'
-    })
-    
-    enhanced_triples.append({
-        'subject': 'kawai.py',
-        'predicate': 'part_of',
-        'object': 'kawaiigpt',
-        'context': 'project_structure',
-        'graph': 'project_structure'
-    })
-    
-    # Add quads for these
-    for triple in enhanced_triples[-2:]:
-        enhanced_quads.append({
-            'subject': triple['subject'],
-            'predicate': triple['predicate'],
-            'object': triple['object'],
-            'graph': triple['graph'],
-            'context': triple['context']
-        })
+    append_unique(enhanced_triples, seen_triples, Triple(
+        subject='install.py',
+        predicate='part_of',
+        object='kawaiigpt',
+        context='project_structure',
+        graph='project_structure'
+    ))
+    
+    append_unique(enhanced_triples, seen_triples, Triple(
+        subject='kawai.py',
+        predicate='part_of',
+        object='kawaiigpt',
+        context='project_structure',
+        graph='project_structure'
+    ))
     
     # Extract semantic concepts from README
     readme_path = project_path / "README.md"
@@ -144,61 +148,53 @@ def analyze_with_serena_semantics():
         concepts = ['KawaiiGPT', 'Python', 'Termux', 'Linux', 'installation', 'voice', 'ALSA']
         for concept in concepts:
             if concept.lower() in readme_content.lower():
-                enhanced_triples.append({
-                    'subject': 'kawaiigpt',
-                    'predicate': 'related_to',
-                    'object': concept,
-                    'context': 'README.md',
-                    'graph': 'concept_graph'
-                })
-                enhanced_quads.append({
-                    'subject': 'kawaiigpt',
-                    'predicate': 'related_to',
-                    'object': concept,
-                    'graph': 'concept_graph',
-                    'context': 'README.md'
-                })
-    
-    # Group triples and quads by graph type
+                append_unique(enhanced_triples, seen_triples, Triple(
+                    subject='kawaiigpt',
+                    predicate='related_to',
+                    object=concept,
+                    context='README.md',
+                    graph='concept_graph'
+                ))
+    
+    # Convert to dicts once and group them by graph type. The quads keys refer to
+    # the same lists, since every triple is also a quad
+    triple_dicts = [t._asdict() for t in enhanced_triples]
     triples_by_graph = defaultdict(list)
-    quads_by_graph = defaultdict(list)
     
-    for triple in enhanced_triples:
-        graph = triple.get('graph', 'default')
-        triples_by_graph[graph].append(triple)
-    
-    for quad in enhanced_quads:
-        graph = quad.get('graph', 'default')
-        quads_by_graph[graph].append(quad)
+    for triple in triple_dicts:
+        triples_by_graph[triple['graph']].append(triple)
+    triples_by_graph = dict(triples_by_graph)
     
     # Create comprehensive results
     results = {
         'summary': {
-            'total_triples': len(enhanced_triples),
-            'total_quads': len(enhanced_quads),
+            'total_triples': len(triple_dicts),
+            'total_quads': len(triple_dicts),
             'files_analyzed': list(files_info.keys()),
             'graphs': list(triples_by_graph.keys())
         },
-        'triples': enhanced_triples,
-        'quads': enhanced_quads,
-        'triples_by_graph': {k: v for k, v in triples_by_graph.items()},
-        'quads_by_graph': {k: v for k, v in quads_by_graph.items()},
+        'triples': triple_dicts,
+        'quads': triple_dicts,
+        'triples_by_graph': triples_by_graph,
+        'quads_by_graph': triples_by_graph,
         'files_info': files_info
     }
     
     # Save comprehensive results
     output_file = project_path / "serena_comprehensive_analysis.json"
-    with open(output_file, 'w') as f:
-        json.dump(results, f, indent=2)
+    if orjson is not None:
+        output_file.write_bytes(orjson.dumps(results, option=orjson.OPT_INDENT_2))
+    else:
+        output_file.write_text(json.dumps(results, indent=2))
     
     print(f"\n=== Comprehensive Analysis Complete ===")
     print(f"Total triples: {len(enhanced_triples)}")
-    print(f"Total quads: {len(enhanced_quads)}")
+    print(f"Total quads: {len(triple_dicts)}")
     print(f"\nTriples by graph:")
     for graph, triples in triples_by_graph.items():
         print(f"  {graph}: {len(triples)} triples")
     print(f"\nQuads by graph:")
-    for graph, quads in quads_by_graph.items():
+    for graph, quads in triples_by_graph.items():
         print(f"  {graph}: {len(quads)} quads")
     print(f"\nResults saved to: {output_file}")
     